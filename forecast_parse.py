@@ -0,0 +1,746 @@
+import json
+import logging
+import re
+import reprlib
+from collections import namedtuple, defaultdict
+from typing import Any, Optional, List, Dict
+from logger_config import server_logger as logger, forecast_logger, dlog
+
+# 有安裝 orjson 時以其解析 JSON 字串，否則使用標準函式庫
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# 日誌中只輸出資料的前幾筆與前段內容，不必為了記錄而將整份資料轉成字串
+_preview = reprlib.Repr()
+_preview.maxlist = 3
+_preview.maxdict = 3
+_preview.maxstring = 100
+_preview.maxother = 100
+
+# 可轉換為數值的元素值：數字中最多含一個小數點
+_is_number = re.compile(r"\d+\.?\d*|\.\d+").fullmatch
+
+def _to_float(value: str) -> Optional[float]:
+    """將元素值轉換為數值，「未知」或非數值時返回 None"""
+    return float(value) if _is_number(value) else None
+
+# 七日預報各層資料可能使用的欄位名稱（依優先順序）
+WEATHER_ELEMENT_FIELDS = ("weatherElement", "WeatherElement", "weather_element", "Weather_Element", "weatherElements", "WeatherElements")
+ELEMENT_NAME_FIELDS = ("elementName", "ElementName", "name", "Name", "element_name", "Element_Name")
+TIME_FIELDS = ("time", "Time")
+START_TIME_FIELDS = ("startTime", "StartTime")
+END_TIME_FIELDS = ("endTime", "EndTime")
+ELEMENT_VALUE_FIELDS = ("elementValue", "ElementValue")
+VALUE_SOURCE_FIELDS = ("elementValue", "ElementValue", "parameter", "Parameter")
+PARAMETER_VALUE_FIELDS = ("parameterName", "ParameterName", "value", "Value")
+DESCRIPTION_FIELDS = ("value", "Value", "WeatherDescription", "weatherDescription")
+
+# 同一份回應中所有地點的欄位名稱相同，偵測一次後直接使用
+SchemaKeys = namedtuple("SchemaKeys", ["weather_element", "element_name", "time", "start_time", "end_time", "element_value"])
+
+# 依（預報類型, 地點欄位集合）快取已偵測的欄位名稱，重複查詢時不必再逐一嘗試
+_schema_cache: Dict[tuple, SchemaKeys] = {}
+
+def _first_key(mapping: dict, candidates, require_value: bool = False) -> Optional[str]:
+    """返回 candidates 中第一個存在於 mapping 的鍵
+
+    Args:
+        mapping: 要檢查的字典
+        candidates: 依優先順序排列的候選鍵
+        require_value: 是否要求該鍵的值不為空
+
+    Returns:
+        找到的鍵，找不到時返回 None
+    """
+    # 每個時段都會呼叫，使用一般迴圈以免每次建立產生器
+    if require_value:
+        for key in candidates:
+            if mapping.get(key):
+                return key
+        return None
+    for key in candidates:
+        if key in mapping:
+            return key
+    return None
+
+def _detect_schema(elements: Any, weather_element_field: str, element_name_field: Optional[str]) -> SchemaKeys:
+    """由第一個天氣元素及其第一個時段偵測時間與元素值的欄位名稱
+
+    Args:
+        elements: 地點的天氣元素列表
+        weather_element_field: 天氣元素欄位名稱
+        element_name_field: 元素名稱欄位名稱
+
+    Returns:
+        偵測到的欄位名稱，無法判斷的欄位為 None
+    """
+    first_element = elements[0] if isinstance(elements, list) and elements and isinstance(elements[0], dict) else {}
+    time_field = _first_key(first_element, TIME_FIELDS)
+    periods = first_element.get(time_field) if time_field else None
+    first_period = periods[0] if isinstance(periods, list) and periods and isinstance(periods[0], dict) else {}
+    return SchemaKeys(
+        weather_element=weather_element_field,
+        element_name=element_name_field,
+        time=time_field,
+        start_time=_first_key(first_period, START_TIME_FIELDS),
+        end_time=_first_key(first_period, END_TIME_FIELDS),
+        element_value=_first_key(first_period, ELEMENT_VALUE_FIELDS, require_value=True)
+    )
+
+def _build_location_variants(location: str) -> tuple:
+    """建立地點名稱的變體（臺/台互換，並補上「市」與「縣」）
+
+    Args:
+        location: 使用者指定的地點名稱
+
+    Returns:
+        地點名稱變體
+    """
+    location_variants = [location]
+    if '臺' in location:
+        location_variants.append(location.replace('臺', '台'))
+    elif '台' in location:
+        location_variants.append(location.replace('台', '臺'))
+    
+    # 添加「市」和「縣」的變體
+    for base_variant in location_variants.copy():
+        if not base_variant.endswith('市') and not base_variant.endswith('縣'):
+            location_variants.append(base_variant + '市')
+            location_variants.append(base_variant + '縣')
+    return tuple(location_variants)
+
+def _matches_location(name: str, location_variants: tuple) -> bool:
+    """檢查地點名稱是否包含任一變體，或被任一變體包含"""
+    for variant in location_variants:
+        if variant in name or name in variant:
+            return True
+    return False
+
+def _match_location_entry(loc: dict, loc_name: str, location_variants: tuple) -> Optional[tuple]:
+    """檢查七日預報的地點資料是否為目標地點或包含目標行政區
+
+    Args:
+        loc: 地點資料
+        loc_name: 地點名稱
+        location_variants: 目標地點的名稱變體
+
+    Returns:
+        符合時返回 (地點資料, 地點名稱)，符合的是行政區時返回行政區的資料與名稱；不符合時返回 None
+    """
+    logger.info("正在匹配地點: %s", loc_name)
+    
+    # 先檢查是否為目標地點
+    # 使用更寬鬆的匹配方式，檢查地點名稱是否包含目標地點名稱，或目標地點名稱是否包含地點名稱
+    if _matches_location(loc_name, location_variants):
+        logger.info("找到匹配的地點: %s", loc_name)
+        return loc, loc_name
+    
+    # 如果不是目標地點，檢查是否為其行政區
+    districts = loc.get("Districts", [])
+    if districts:
+        logger.info("檢查行政區: %s", [d.get('DistrictName', '') for d in districts])
+        for district in districts:
+            district_name = district.get('DistrictName', '')
+            if _matches_location(district_name, location_variants):
+                logger.info("找到匹配的行政區: %s", district_name)
+                # 使用行政區的資料
+                return district, district_name
+    return None
+
+class ForecastSlot:
+    """預報單一時段的資料（36 小時與七日預報共用），使用 __slots__ 以固定欄位保存"""
+    __slots__ = ("wx", "wx_code", "max_t", "min_t", "pop", "ci", "elements")
+
+    def __init__(self) -> None:
+        self.wx = "未知"         # 天氣現象
+        self.wx_code = ""        # 天氣代碼
+        self.max_t = "未知"      # 最高溫
+        self.min_t = "未知"      # 最低溫
+        self.pop = "未知"        # 降雨機率
+        self.ci = "未知"         # 舒適度
+        self.elements = {}       # 存儲所有元素資料
+
+# 七日預報元素值的解析函式：依元素名稱更新時段資料（slot，見 ForecastSlot），value_field 為該時段的元素值欄位名稱
+def _h_description(period: dict, slot: ForecastSlot, value_field: str) -> None:
+    """處理「天氣預報綜合描述」元素 (7天預報)"""
+    values = period[value_field]
+    if not values:
+        return
+    # 嘗試從不同格式獲取描述
+    element_value = values[0]
+    
+    # 檢查各種可能的欄位名稱
+    desc_field = _first_key(element_value, DESCRIPTION_FIELDS)
+    description = element_value[desc_field] if desc_field else "未知"
+    
+    # 如果沒有找到任何已知的欄位，嘗試使用字串表示
+    if description == "未知":
+        description = str(element_value)
+        logger.warning("使用備用方法解析天氣預報綜合描述: %s", description[:50] + "..." if len(description) > 50 else description)
+    
+    # 使用天氣預報綜合描述作為天氣現象
+    slot.wx = description
+    slot.wx_code = ""  # 綜合描述沒有對應的代碼
+    # 截斷描述也有成本，只在需要輸出除錯訊息時才進行
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("解析天氣預報綜合描述: %s", description[:50] + "..." if len(description) > 50 else description)
+
+def _h_weather(period: dict, slot: ForecastSlot, value_field: str) -> None:
+    """處理 F-D0047-091 格式的「天氣現象」元素 (7天預報)"""
+    values = period[value_field]
+    if not values:
+        return
+    first = values[0]
+    # 檢查是否有 Weather 和 WeatherCode 欄位
+    if "Weather" in first:
+        slot.wx = first.get("Weather", "未知")
+        slot.wx_code = first.get("WeatherCode", "")
+        dlog(logger, "解析天氣現象 (7天預報): %s (代碼: %s)", slot.wx, slot.wx_code)
+    # 如果沒有 Weather 欄位，嘗試使用舊格式
+    elif "value" in first:
+        slot.wx = first.get("value", "未知")
+        if len(values) > 1:
+            slot.wx_code = values[1].get("value", "")
+        dlog(logger, "解析天氣現象 (舊格式): %s (代碼: %s)", slot.wx, slot.wx_code)
+
+def _h_wx(period: dict, slot: ForecastSlot, value_field: str) -> None:
+    """處理 Wx 元素"""
+    values = period[value_field]
+    if not values:
+        return
+    slot.wx = values[0].get("value", "未知")
+    if len(values) > 1:
+        slot.wx_code = values[1].get("value", "")
+    dlog(logger, "解析天氣現象 (Wx): %s (代碼: %s)", slot.wx, slot.wx_code)
+
+def _make_value_handler(slot_key: str, label: str, list_fields: tuple):
+    """建立從 elementValue 第一個值取出欄位的解析函式
+
+    Args:
+        slot_key: 要更新的時段資料欄位名稱
+        label: 日誌中的元素說明
+        list_fields: 依優先順序嘗試的值欄位名稱
+
+    Returns:
+        元素值的解析函式
+    """
+    def handler(period: dict, slot: ForecastSlot, value_field: str) -> None:
+        values = period[value_field]
+        if not values:
+            return
+        first = values[0]
+        field = _first_key(first, list_fields)
+        if field:
+            setattr(slot, slot_key, first[field])
+            dlog(logger, "解析%s: %s", label, getattr(slot, slot_key))
+    return handler
+
+def _make_multi_format_handler(slot_key: str, label: str, list_fields: tuple):
+    """建立支援 elementValue/ElementValue/parameter/Parameter 多種格式的解析函式
+
+    Args:
+        slot_key: 要更新的時段資料欄位名稱
+        label: 日誌中的元素說明
+        list_fields: 值為列表時依優先順序嘗試的欄位名稱
+
+    Returns:
+        元素值的解析函式
+    """
+    def handler(period: dict, slot: ForecastSlot, value_field: str) -> None:
+        # 呼叫端已找到有值的元素值欄位，直接使用；否則才依序檢查各種欄位名稱格式
+        source = period.get(value_field)
+        if not source:
+            source_field = _first_key(period, VALUE_SOURCE_FIELDS, require_value=True)
+            if not source_field:
+                return
+            source = period[source_field]
+        if isinstance(source, list):
+            source = source[0]
+            field = _first_key(source, list_fields)
+        elif isinstance(source, dict):
+            field = _first_key(source, PARAMETER_VALUE_FIELDS)
+        else:
+            return
+        if field:
+            setattr(slot, slot_key, source[field])
+            dlog(logger, "解析%s: %s", label, getattr(slot, slot_key))
+    return handler
+
+_h_pop = _make_multi_format_handler("pop", "降雨機率", ("value", "Value", "parameterName", "ParameterName"))
+
+# 有元素值欄位（elementValue/ElementValue）時，依元素名稱分派的解析函式
+_DISPATCH_7D = {
+    "天氣預報綜合描述": _h_description,
+    "天氣現象": _h_weather,
+    "Wx": _h_wx,
+    "MaxT": _make_value_handler("max_t", "最高溫度 (MaxT)", ("value",)),
+    "MinT": _make_value_handler("min_t", "最低溫度 (MinT)", ("value",)),
+    "最高溫度": _make_multi_format_handler("max_t", "最高溫度", ("MaxTemperature", "value", "Value", "parameterName", "ParameterName")),
+    "最低溫度": _make_multi_format_handler("min_t", "最低溫度", ("MinTemperature", "value", "Value", "parameterName", "ParameterName")),
+    "PoP": _h_pop,
+    "降雨機率": _h_pop,
+    "12小時降雨機率": _make_value_handler("pop", "降雨機率 (7天預報)", ("ProbabilityOfPrecipitation",)),
+    "CI": _make_value_handler("ci", "舒適度 (CI)", ("value",)),
+}
+
+# F-C0032-001 格式 (36小時預報) 的 parameter 欄位解析函式，parse_36h 與 parse_7d 共用；
+# with_unit 為 True 時在值後附上單位（parse_36h 的輸出格式），否則保留原始值供轉換為數值
+def _h_param_wx(period: dict, slot: ForecastSlot, with_unit: bool = False) -> None:
+    slot.wx = period["parameter"].get("parameterName", "未知")
+    slot.wx_code = period["parameter"].get("parameterValue", "")
+    dlog(logger, "解析天氣現象: %s (代碼: %s)", slot.wx, slot.wx_code)
+
+def _make_param_handler(slot_key: str, label: str, unit: Optional[str] = None):
+    """建立從 parameter 欄位取出 parameterName 的解析函式
+
+    Args:
+        slot_key: 要更新的時段資料欄位名稱
+        label: 日誌中的元素說明
+        unit: 附加單位時使用的固定單位，None 表示使用 parameterUnit
+
+    Returns:
+        parameter 欄位的解析函式
+    """
+    def handler(period: dict, slot: ForecastSlot, with_unit: bool = False) -> None:
+        parameter = period["parameter"]
+        value = parameter.get("parameterName", "未知")
+        if with_unit:
+            value = f"{value}{parameter.get('parameterUnit', '') if unit is None else unit}"
+        setattr(slot, slot_key, value)
+        dlog(logger, "解析%s: %s", label, value)
+    return handler
+
+_DISPATCH_36H = {
+    "Wx": _h_param_wx,
+    "MaxT": _make_param_handler("max_t", "最高溫度"),
+    "MinT": _make_param_handler("min_t", "最低溫度"),
+    "PoP": _make_param_handler("pop", "降雨機率", unit="%"),
+    "CI": _make_param_handler("ci", "舒適度", unit=""),
+}
+
+# 只回傳天氣預報綜合描述時，只需要會寫入描述（ForecastSlot.wx）的解析函式
+_DISPATCH_7D_DESCRIPTION = {name: _DISPATCH_7D[name] for name in ("天氣預報綜合描述", "天氣現象", "Wx")}
+_DISPATCH_36H_DESCRIPTION = {"Wx": _DISPATCH_36H["Wx"]}
+
+def parse_36h(locations_data: List[Dict[str, Any]], location: Optional[str], forecast_type: str) -> Dict[str, Any]:
+    """解析 36 小時預報（records.location）的地點資料
+
+    Args:
+        locations_data: API 回應中 records.location 的地點列表
+        location: 指定的地點名稱，None 表示全部地點
+        forecast_type: 預報類型
+
+    Returns:
+        單一地點的預報、多個地點的預報列表，或錯誤訊息
+    """
+    forecast_logger.info("找到 %s 個地點資料", len(locations_data))
+    
+    # 處理地點資料
+    result = []
+    for loc in locations_data:
+        # 如果指定了位置但不匹配，則跳過
+        if location and location not in loc["locationName"]:
+            dlog(forecast_logger, "跳過不匹配的地點: %s", loc['locationName'])
+            continue
+            
+        loc_name = loc["locationName"]
+        forecast_logger.info("處理地點: %s", loc_name)
+        
+        # 建立回應格式
+        response = {
+            "location": loc_name,
+            "forecast_type": forecast_type,
+            "forecasts": []
+        }
+        result.append(response)
+        
+        # 建立時間段到預報數據的映射，第一次存取時段時自動建立預設資料
+        time_forecasts = defaultdict(ForecastSlot)
+        
+        if "weatherElement" not in loc:
+            forecast_logger.error("地點 %s 中缺少 weatherElement 欄位", loc_name)
+            continue
+        
+        # 處理每個天氣元素
+        for element in loc["weatherElement"]:
+            element_name = element["elementName"]
+            if "time" not in element:
+                continue
+            handler = _DISPATCH_36H.get(element_name)
+                
+            for period in element["time"]:
+                if "startTime" not in period or "endTime" not in period:
+                    continue
+                    
+                slot = time_forecasts[(period["startTime"], period["endTime"])]
+                
+                # 根據元素類型更新資料，只在有 parameterName 時更新
+                if handler and "parameter" in period and period["parameter"].get("parameterName"):
+                    handler(period, slot, True)
+        
+        # 將每個時段的預報整理成結構化格式
+        add_forecast = response["forecasts"].append
+        for start_time, end_time in sorted(time_forecasts):
+            forecast = time_forecasts[(start_time, end_time)]
+            forecast_item = {
+                "start_time": start_time,
+                "end_time": end_time,
+                "weather": forecast.wx or "未知",
+                "weather_code": forecast.wx_code or "",
+                "max_temperature": forecast.max_t or "未知",
+                "min_temperature": forecast.min_t or "未知",
+                "precipitation_probability": forecast.pop or "未知",
+                "comfort_index": forecast.ci or "未知"
+            }
+            add_forecast(forecast_item)
+        
+        # 如果有預報資料，加入結果列表
+        if response["forecasts"]:
+            forecast_logger.info("成功解析地點 %s 的預報資料，共 %s 筆", loc_name, len(response['forecasts']))
+        else:
+            logger.warning("地點 %s 沒有預報資料", loc_name)
+    
+    # 處理最終結果
+    if not result:
+        logger.warning("未找到地點 %s 的天氣預報資料", location if location else '所有地點')
+        return {"error": f"找不到 {location} 的天氣預報資料" if location else "無法取得天氣預報資料"}
+    elif len(result) == 1:
+        return result[0]
+    else:
+        return {"locations": result}
+
+def parse_7d(locations_list: Any, location: Optional[str], forecast_type: str,
+             element_types: Optional[str]) -> Optional[Dict[str, Any]]:
+    """解析七日預報（records.Locations）的地點資料
+
+    Args:
+        locations_list: API 回應中 records.Locations 的內容（列表或字典）
+        location: 指定的地點名稱，None 表示全部地點
+        forecast_type: 預報類型
+        element_types: 使用者指定的天氣元素類型（逗號分隔）
+
+    Returns:
+        單一地點的預報、多個地點的預報列表或錯誤訊息；找不到任何地點資料時返回 None
+    """
+    logger.info("Locations 欄位類型: %s", type(locations_list))
+    
+    # 尋找匹配的地點資料
+    locations_data = []
+    
+    # 如果 Locations 是一個列表，需要遍歷它來找到 Location 欄位
+    if isinstance(locations_list, list):
+        for locations_group in locations_list:
+            if "Location" in locations_group:
+                # 將所有地點資料加入列表
+                locations_data.extend(locations_group["Location"])
+    # 如果 Locations 是一個字典，直接檢查是否有 Location 欄位
+    elif isinstance(locations_list, dict) and "Location" in locations_list:
+        locations_data = locations_list["Location"]
+    
+    if locations_data:
+        logger.info("找到 %s 個地點資料", len(locations_data))
+        for i, loc in enumerate(locations_data[:2]):  # 只記錄前兩個地點以避免日誌過長
+            logger.info("地點 %s: %s", i+1, loc.get('LocationName', '未知'))
+        
+        # 地點名稱變體只需建立一次
+        location_variants = _build_location_variants(location) if location else ()
+        if location:
+            logger.info("地點變體: %s", list(location_variants))
+        
+        # 先篩選出符合的地點，只對這些地點解析天氣元素
+        matched_locations = []
+        for loc in locations_data:
+            # 結構可能有所不同，檢查地點名稱欄位
+            loc_name_field = "LocationName" if "LocationName" in loc else "locationName"
+            if loc_name_field not in loc:
+                dlog(logger, "跳過缺少地點名稱的資料: %s", loc)
+                continue
+                
+            # 如果指定了位置但不匹配，則跳過
+            loc_name = loc[loc_name_field]
+            if location:
+                matched = _match_location_entry(loc, loc_name, location_variants)
+                if matched is None:
+                    dlog(logger, "跳過不匹配的地點: %s", loc_name)
+                    continue
+                loc, loc_name = matched
+            matched_locations.append((loc, loc_name))
+        
+        # 沒有指定元素類型或只要求「天氣預報綜合描述」時，回應只包含時段與描述，
+        # 其他元素只用來建立時段，不必解析元素值或保存元素資料
+        only_weather_description = not element_types or element_types == "天氣預報綜合描述"
+        dispatch_7d = _DISPATCH_7D_DESCRIPTION if only_weather_description else _DISPATCH_7D
+        dispatch_36h = _DISPATCH_36H_DESCRIPTION if only_weather_description else _DISPATCH_36H
+        # 使用者指定的元素類型，所有地點與時段共用
+        requested_elements = frozenset(e.strip() for e in element_types.split(",")) if isinstance(element_types, str) else element_types
+        
+        # 處理地點資料
+        result = []
+        schema = None
+        # 以字串表示的天氣元素解析結果，多個地點的內容相同時只解析一次
+        parsed_strings: Dict[str, Any] = {}
+        for loc, loc_name in matched_locations:
+            logger.info("處理地點: %s", loc_name)
+            
+            # 建立時間段到預報數據的映射，第一次存取時段時自動建立預設資料
+            time_forecasts = defaultdict(ForecastSlot)
+            
+            # 已偵測過相同結構時直接使用快取的欄位名稱，否則逐一嘗試可能的欄位名稱
+            # 同一份回應中的地點結構通常相同，上一個地點的欄位名稱適用時不必建立快取鍵
+            cached_schema = schema
+            if cached_schema is None or not loc.get(cached_schema.weather_element):
+                schema_key = (forecast_type, frozenset(loc.keys()))
+                cached_schema = _schema_cache.get(schema_key)
+            if cached_schema and loc.get(cached_schema.weather_element):
+                schema = cached_schema
+                weather_element_field = schema.weather_element
+                element_name_field = schema.element_name
+            else:
+                # 檢查天氣元素欄位名稱（weatherElement、WeatherElement 等），API 新增其他寫法時加入 WEATHER_ELEMENT_FIELDS
+                weather_element_field = _first_key(loc, WEATHER_ELEMENT_FIELDS, require_value=True)
+                if weather_element_field:
+                    logger.info("在地點 %s 中找到天氣元素欄位: %s", loc_name, weather_element_field)
+            
+                # 如果仍然沒有找到天氣元素欄位，輸出詳細的訊息並跳過處理
+                if not weather_element_field:
+                    logger.error("地點 %s 中缺少天氣元素欄位", loc_name)
+                    # 輸出可用的欄位名稱以協助診斷
+                    logger.error("可用的欄位名稱: %s", list(loc.keys()))
+                    continue
+                
+                # 檢查元素名稱欄位是 elementName 還是 ElementName 或其他可能的欄位名稱
+                element_name_field = None
+                
+                # 確保天氣元素是不為空的列表（字串形式的元素在下方解析後才檢查元素名稱）
+                if isinstance(loc[weather_element_field], list) and loc[weather_element_field]:
+                    first_element = loc[weather_element_field][0]
+                
+                    # 先檢查常見的欄位名稱
+                    element_name_field = _first_key(first_element, ELEMENT_NAME_FIELDS)
+                    if element_name_field:
+                        logger.info("找到元素名稱欄位: %s", element_name_field)
+                
+                    # 如果沒找到，嘗試尋找包含 'name' 或 'Name' 的欄位
+                    if not element_name_field:
+                        for field in first_element.keys():
+                            if 'name' in field.lower() or 'element' in field.lower():
+                                element_name_field = field
+                                logger.info("找到可能的元素名稱欄位: %s", field)
+                                break
+                
+                    # 如果仍然沒有找到元素名稱欄位，輸出詳細的訊息
+                    if not element_name_field:
+                        logger.warning("無法確定元素名稱欄位，可用的欄位: %s", list(first_element.keys()))
+                        # 預設使用 elementName
+                        element_name_field = "elementName"
+                
+            # 記錄天氣元素類型
+            # 輸出天氣元素的詳細資訊
+            logger.info("天氣元素欄位類型: %s", type(loc[weather_element_field]))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("天氣元素欄位內容: %s", _preview.repr(loc[weather_element_field]))
+            
+            # 如果是字典，嘗試尋找其中的元素列表
+            if isinstance(loc[weather_element_field], dict):
+                logger.info("天氣元素欄位是字典，其中的鍵: %s", list(loc[weather_element_field].keys()))
+                # 嘗試尋找可能包含元素列表的鍵
+                for key in loc[weather_element_field].keys():
+                    if isinstance(loc[weather_element_field][key], list):
+                        logger.info("在鍵 %s 中找到列表類型的值", key)
+                        # 更新天氣元素欄位
+                        weather_element_field = f"{weather_element_field}.{key}"
+                        break
+            
+            # 如果是字串，嘗試解析為 JSON
+            if isinstance(loc[weather_element_field], str):
+                try:
+                    raw = loc[weather_element_field]
+                    parsed = parsed_strings.get(raw)
+                    if parsed is None:
+                        parsed = parsed_strings[raw] = json_loads(raw)
+                    logger.info("將字串解析為 JSON: %s", type(parsed))
+                    # 更新天氣元素欄位
+                    loc[weather_element_field] = parsed
+                except json.JSONDecodeError:
+                    logger.warning("無法將天氣元素欄位解析為 JSON")
+            
+            # 如果是列表，檢查其內容
+            if isinstance(loc[weather_element_field], list):
+                if len(loc[weather_element_field]) > 0:
+                    logger.info("天氣元素列表長度: %s", len(loc[weather_element_field]))
+                    logger.info("第一個元素的類型: %s", type(loc[weather_element_field][0]))
+                    if isinstance(loc[weather_element_field][0], dict):
+                        logger.info("第一個元素的鍵: %s", list(loc[weather_element_field][0].keys()))
+                else:
+                    logger.warning("天氣元素列表為空")
+                    
+                    # 如果天氣元素列表為空，嘗試從原始資料中擷取
+                    logger.info("地點 %s 的可用欄位: %s", loc_name, list(loc.keys()))
+                    
+                    # 直接檢查原始資料中的天氣元素
+                    if 'weatherElement' in loc and loc['weatherElement']:
+                        loc[weather_element_field] = loc['weatherElement']
+                        logger.info("從原始資料中擷取 weatherElement: %s 個元素", len(loc[weather_element_field]))
+                    elif 'WeatherElement' in loc and loc['WeatherElement']:
+                        loc[weather_element_field] = loc['WeatherElement']
+                        logger.info("從原始資料中擷取 WeatherElement: %s 個元素", len(loc[weather_element_field]))
+            
+            # 列出天氣元素，只在會輸出 INFO 訊息時才建立名稱列表
+            if logger.isEnabledFor(logging.INFO):
+                try:
+                    weather_elements = [elem.get(element_name_field, "未知") for elem in loc[weather_element_field]]
+                    logger.info("地點 %s 的天氣元素: %s", loc_name, weather_elements)
+                except Exception as e:
+                    logger.error("無法列出天氣元素: %s", str(e))
+                    # 嘗試直接列出天氣元素欄位的內容
+                    logger.info("天氣元素欄位內容: %s", _preview.repr(loc[weather_element_field]))
+            
+            # 以第一個天氣元素偵測時間與元素值的欄位名稱，之後的元素與時段直接使用
+            if schema is None or schema.weather_element != weather_element_field:
+                schema = _detect_schema(loc[weather_element_field], weather_element_field, element_name_field)
+                _schema_cache[schema_key] = schema
+            
+            # 先找出所有時段
+            for element in loc[weather_element_field]:
+                # 元素名稱欄位通常就是偵測到的欄位，只有缺少時才檢查 elementName 與 ElementName
+                element_name = element[element_name_field] if element_name_field in element else element.get("elementName", element.get("ElementName", "未知"))
+                
+                handler_7d = dispatch_7d.get(element_name)
+                handler_36h = dispatch_36h.get(element_name)
+                
+                # 檢查時間欄位是 time 還是 Time
+                time_field = schema.time if schema.time in element else _first_key(element, TIME_FIELDS)
+                        
+                if not time_field:
+                    logger.error("元素 %s 中缺少時間欄位 (time/Time)", element_name)
+                    continue
+                    
+                for period in element[time_field]:
+                    # 檢查開始和結束時間欄位的不同格式
+                    start_time_field = schema.start_time if schema.start_time in period else _first_key(period, START_TIME_FIELDS)
+                    end_time_field = schema.end_time if schema.end_time in period else _first_key(period, END_TIME_FIELDS)
+                            
+                    if not start_time_field or not end_time_field:
+                        logger.error("時段缺少開始或結束時間")
+                        continue
+                        
+                    time_key = (period[start_time_field], period[end_time_field])
+                    slot = time_forecasts[time_key]
+                    
+                    if only_weather_description:
+                        # 此元素不影響描述，只需要建立時段
+                        if not handler_7d and not handler_36h:
+                            continue
+                    else:
+                        # 直接將整個元素資料保存到 weather_elements 字典中
+                        # 這樣前端可以直接使用元素資料，不需要後端解析內部欄位結構
+                        slot.elements[element_name] = element
+                    
+                    # 記錄元素處理
+                    dlog(logger, "處理元素: %s 於時段 %s 至 %s", element_name, time_key[0], time_key[1])
+                        
+                    # 已經直接將整個元素資料保存到 weather_elements 字典中
+                    # 不再需要解析元素值欄位
+                    # 為了向後相容，我們仍然會將一些常用的元素值記錄到特定欄位
+                    element_value_field = schema.element_value if period.get(schema.element_value) else _first_key(period, ELEMENT_VALUE_FIELDS, require_value=True)
+                            
+                    if element_value_field:
+                        if handler_7d:
+                            handler_7d(period, slot, element_value_field)
+                    elif "parameter" in period:
+                        # 處理 F-C0032-001 格式 (36小時預報)
+                        if handler_36h and period["parameter"]:
+                            handler_36h(period, slot)
+            
+            logger.info("地點 %s 的時段數: %s", loc_name, len(time_forecasts))
+            
+            # 建立回應格式
+            response = {
+                "location": loc_name,
+                "forecast_type": forecast_type,
+                "forecasts": []
+            }
+            
+            # 收集可用的天氣元素類型（去除重複並保留原本順序）
+            available_element_types = list(dict.fromkeys(
+                element_name for element_name in (element.get("elementName") for element in loc.get("weatherElement", []))
+                if element_name
+            ))
+            
+            # 將可用的天氣元素類型添加到回應中
+            response["available_element_types"] = available_element_types
+            
+            # 如果沒有指定元素類型，預設只顯示天氣預報綜合描述
+            if not element_types:
+                response["message"] = f"目前只顯示天氣預報綜合描述。您也可以查詢其他天氣資料類型，例如：{', '.join(available_element_types[:5])}等。請在查詢時指定 element_types 參數。"
+            
+            # 將每個時段的預報整理成結構化格式
+            add_forecast = response["forecasts"].append
+            for start_time, end_time in sorted(time_forecasts):
+                forecast = time_forecasts[(start_time, end_time)]
+                if only_weather_description:
+                    # 如果只要求綜合描述，則只返回時間和描述
+                    forecast_item = {
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "weather_description": forecast.wx
+                    }
+                else:
+                    # 否則返回完整的天氣資訊
+                    forecast_item = {
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "weather": forecast.wx,
+                        "weather_code": forecast.wx_code if forecast.wx_code != "" else None,
+                        "temperature": {
+                            "min": _to_float(forecast.min_t),
+                            "max": _to_float(forecast.max_t)
+                        },
+                        "precipitation_probability": _to_float(forecast.pop),
+                        "comfort": forecast.ci if forecast.ci != "未知" else None
+                    }
+                    
+                    # 如果有指定元素類型且不是預設的「天氣預報綜合描述」，則加入該元素的資料
+                    if element_types and element_types != "天氣預報綜合描述":
+                        # 將使用者指定的元素類型資料加入回應
+                        if isinstance(requested_elements, (list, frozenset)):
+                            # 如果指定了特定元素，則只回傳該元素的資料，不包含其他欄位
+                            # 這樣可以減少回應的大小，並使前端更容易處理
+                            forecast_item = {
+                                "start_time": start_time,
+                                "end_time": end_time,
+                                "weather_elements": {}
+                            }
+                            
+                            for elem_name, elem_data in forecast.elements.items():
+                                if elem_name in requested_elements:
+                                    # 直接將整個元素資料加入回應
+                                    # 不在後端分析元素內的欄位結構，讓前端自行處理
+                                    forecast_item["weather_elements"][elem_name] = elem_data
+                                    dlog(logger, "加入元素 %s 到回應中", elem_name)
+                                    
+
+                        else:
+                            logger.warning("無法解析元素類型: %s", requested_elements)
+                add_forecast(forecast_item)
+            
+            # 如果有預報資料，加入結果列表
+            if response["forecasts"]:
+                logger.info("成功解析地點 %s 的七日預報資料，共 %s 筆", loc_name, len(response['forecasts']))
+                result.append(response)
+            else:
+                logger.warning("地點 %s 沒有七日預報資料", loc_name)
+        
+        # 處理最終結果
+        if not result:
+            logger.warning("未找到地點 %s 的七日天氣預報資料", location if location else '所有地點')
+            return {"error": f"找不到 {location} 的七日天氣預報資料" if location else "無法取得七日天氣預報資料"}
+        elif len(result) == 1:
+            return result[0]
+        else:
+            return {"locations": result}
+    
+    return None
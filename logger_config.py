@@ -1,25 +1,415 @@
 import os
 import sys
+import copy
+import time
+import queue
+import atexit
+import threading
+import traceback
 import logging
+import logging.handlers
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional
 
-# 設定日誌目錄
-LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
-os.makedirs(LOGS_DIR, exist_ok=True)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+# 日誌格式未使用行程與執行緒資訊，關閉建立記錄時的相關查詢
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging.logAsyncioTasks = False
+
+_original_get_message = logging.LogRecord.getMessage
+
+def _get_message(self: logging.LogRecord) -> str:
+    """沒有參數的記錄直接返回訊息，省去 % 格式化"""
+    if not self.args:
+        msg = self.msg
+        return msg if type(msg) is str else str(msg)
+    return _original_get_message(self)
+
+logging.LogRecord.getMessage = _get_message
+
+# 設定日誌目錄（只在匯入時解析一次路徑）
+_LOGS_DIR = Path(__file__).resolve().parent / "logs"
+LOGS_DIR = str(_LOGS_DIR)
+_LOGS_DIR.mkdir(exist_ok=True)
 
 # 日誌檔案路徑
-WEATHER_API_LOG = os.path.join(LOGS_DIR, "weather_api.log")
-API_REQUESTS_LOG = os.path.join(LOGS_DIR, "api_requests.log")
-SERVER_LOG = os.path.join(LOGS_DIR, "server.log")
-WARNINGS_LOG = os.path.join(LOGS_DIR, "warnings.log")
-FORECAST_LOG = os.path.join(LOGS_DIR, "forecast.log")
-OBSERVATION_LOG = os.path.join(LOGS_DIR, "observation.log")
+WEATHER_API_LOG = str(_LOGS_DIR / "weather_api.log")
+API_REQUESTS_LOG = str(_LOGS_DIR / "api_requests.log")
+SERVER_LOG = str(_LOGS_DIR / "server.log")
+WARNINGS_LOG = str(_LOGS_DIR / "warnings.log")
+FORECAST_LOG = str(_LOGS_DIR / "forecast.log")
+OBSERVATION_LOG = str(_LOGS_DIR / "observation.log")
 
 # 日誌格式
 DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 CONSOLE_FORMAT = '[%(asctime)s] %(levelname)-8s %(message)s'
 CONSOLE_DATE_FORMAT = '%m/%d/%y %H:%M:%S'
 
+class FastFormatter(logging.Formatter):
+    """快取每秒時間字串的格式化器
+
+    logging.Formatter 每筆記錄都會呼叫 time.localtime() 與 time.strftime()，
+    此格式化器在同一秒內重複使用已格式化的時間字串，只補上毫秒。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (秒數, 時間字串) 以單一屬性保存，多執行緒共用時不會讀到不一致的組合
+        self._cached_time = (None, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        second = int(record.created)
+        cached_second, cached_str = self._cached_time
+        if second != cached_second:
+            cached_str = time.strftime(datefmt or self.default_time_format, self.converter(second))
+            self._cached_time = (second, cached_str)
+        
+        # 與 logging.Formatter 相同：指定 datefmt 時不附加毫秒
+        if datefmt:
+            return cached_str
+        return self.default_msec_format % (cached_str, record.msecs)
+
+class DefaultFmt(FastFormatter):
+    """DEFAULT_FORMAT 的格式化器，以 f-string 直接組出輸出，省去 %-style 的欄位解析"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        # 帶有例外或堆疊資訊時交由 logging.Formatter 處理
+        if record.exc_info or record.exc_text or record.stack_info:
+            return super().format(record)
+        return f"{self.formatTime(record, self.datefmt)} - {record.name} - {record.levelname} - {record.getMessage()}"
+
+# 控制台格式中預先補齊到 8 個字元的級別名稱
+_LEVEL_PADDED = {
+    logging.DEBUG: "DEBUG   ",
+    logging.INFO: "INFO    ",
+    logging.WARNING: "WARNING ",
+    logging.ERROR: "ERROR   ",
+    logging.CRITICAL: "CRITICAL",
+}
+
+class ConsoleFmt(FastFormatter):
+    """CONSOLE_FORMAT 的格式化器，以 f-string 直接組出輸出，省去 %-style 的欄位解析"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        # 帶有例外或堆疊資訊時交由 logging.Formatter 處理
+        if record.exc_info or record.exc_text or record.stack_info:
+            return super().format(record)
+        levelname = _LEVEL_PADDED.get(record.levelno) or f"{record.levelname:<8}"
+        return f"[{self.formatTime(record, self.datefmt)}] {levelname} {record.getMessage()}"
+
+if orjson is not None:
+    def _dumps_line(obj: dict) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    def _dumps_line(obj: dict) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+class OrjsonFormatter(logging.Formatter):
+    """輸出單行 JSON 的格式化器，供程式解析的日誌使用
+
+    欄位為 t（建立時間戳記）、n（記錄器名稱）、l（級別）、m（訊息），
+    帶有例外資訊時另加 e 欄位，帶有堆疊資訊時另加 s 欄位。不需格式化時間字串，也不需再解析文字格式。
+    未安裝 orjson 時改用標準函式庫的 json。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"t": record.created, "n": record.name, "l": record.levelname, "m": record.getMessage()}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["e"] = record.exc_text
+        if record.stack_info:
+            data["s"] = record.stack_info
+        return _dumps_line(data)
+
+# 共用的格式化器，避免每個記錄器各自建立；設定 WEATHER_LOG_JSON 時檔案日誌改為單行 JSON
+_file_formatter = OrjsonFormatter() if os.environ.get("WEATHER_LOG_JSON") else DefaultFmt(DEFAULT_FORMAT)
+_console_formatter = ConsoleFmt(CONSOLE_FORMAT, CONSOLE_DATE_FORMAT)
+
+# 控制台輸出：stderr 為終端機時才輸出，或以 WEATHER_CONSOLE_LOG 環境變數強制開啟
+_CONSOLE_ENABLED = bool(os.environ.get("WEATHER_CONSOLE_LOG")) or (sys.stderr is not None and sys.stderr.isatty())
+
+# 各功能記錄器的級別：預設 INFO，逐時段的解析細節等 DEBUG 記錄在產生前就會被捨棄；
+# 需要除錯時以 WEATHER_LOG_LEVEL 環境變數調整（例如 WEATHER_LOG_LEVEL=DEBUG）
+LOG_LEVEL = logging.getLevelName(os.environ.get("WEATHER_LOG_LEVEL", "INFO").strip().upper())
+if not isinstance(LOG_LEVEL, int):
+    LOG_LEVEL = logging.INFO
+
+@lru_cache(maxsize=None)
+def _get_console_handler(level: int) -> logging.StreamHandler:
+    """取得共用的控制台處理器，相同級別的記錄器共用同一個處理器
+
+    Args:
+        level: 控制台處理器的日誌級別
+
+    Returns:
+        輸出到 stderr 的控制台處理器
+    """
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(level)
+    console_handler.setFormatter(_console_formatter)
+    return console_handler
+
+# 檔案緩衝設定：累積到指定筆數或遇到 ERROR 以上的記錄時才寫入檔案
+BUFFER_CAPACITY = 512
+BUFFER_FLUSH_INTERVAL = 5.0
+# 檔案的寫入緩衝大小與定期寫入間隔
+FILE_BUFFER_SIZE = 65536
+FILE_FLUSH_INTERVAL = 30.0
+# 日誌檔案輪替設定：單一檔案上限 64 MB，保留 5 個備份
+LOG_MAX_BYTES = 64 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# 日誌佇列：記錄器只負責將記錄放入佇列，實際的檔案寫入由背景執行緒處理
+# SimpleQueue 沒有 task_done 的計數與條件變數，放入記錄的成本較低
+_log_queue = queue.SimpleQueue()
+_file_handlers = []
+_listener = logging.handlers.QueueListener(_log_queue, respect_handler_level=True)
+_listener.start()
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """放入佇列前只展開訊息參數的佇列處理器
+
+    QueueHandler.prepare() 會將例外的追蹤訊息併入 msg 並清除 exc_info 與 exc_text，
+    檔案的格式化器便無法分開輸出例外資訊（例如 JSON 格式的 e 欄位）。
+    此處理器只將 msg 與 args 預先組成訊息，exc_info、exc_text 與 stack_info
+    原樣保留，交由背景執行緒的格式化器處理。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+# 所有記錄器共用同一個佇列處理器
+_queue_handler = _RecordQueueHandler(_log_queue)
+
+def _flush_periodically(stop_event: threading.Event) -> None:
+    """定期將緩衝中的記錄寫入檔案，避免低流量時日誌延遲過久
+
+    單一處理器寫入失敗時只回報錯誤並繼續，不讓背景執行緒因此結束
+    """
+    last_file_flush = time.monotonic()
+    while not stop_event.wait(BUFFER_FLUSH_INTERVAL):
+        # 檔案處理器的緩衝以較長的間隔寫入磁碟
+        flush_files = time.monotonic() - last_file_flush >= FILE_FLUSH_INTERVAL
+        if flush_files:
+            last_file_flush = time.monotonic()
+        
+        for handler in _file_handlers:
+            _safe_flush(handler)
+            target = handler.target
+            if flush_files and target is not None:
+                _safe_flush(target)
+
+def _safe_flush(handler: logging.Handler) -> None:
+    """寫入處理器的緩衝，發生錯誤時比照 Handler.handleError 輸出到 stderr 而不中斷呼叫端"""
+    try:
+        handler.flush()
+    except Exception:
+        if logging.raiseExceptions and sys.stderr:
+            traceback.print_exc(file=sys.stderr)
+
+_flush_stop = threading.Event()
+_flush_thread = threading.Thread(target=_flush_periodically, args=(_flush_stop,), name="log-flusher", daemon=True)
+_flush_thread.start()
+
+def _shutdown() -> None:
+    """先停止佇列監聽器以處理完剩餘記錄，等待定期寫入的執行緒結束後再將緩衝寫入檔案"""
+    _listener.stop()
+    _flush_stop.set()
+    _flush_thread.join()
+    for handler in _file_handlers:
+        handler.close()
+
+atexit.register(_shutdown)
+
+class RawAppendHandler(logging.Handler):
+    """以 os.write 直接寫入 O_APPEND 檔案描述符的檔案處理器
+
+    一般的 FileHandler 每筆記錄都經過 TextIOWrapper 與 BufferedWriter 並呼叫 flush()。
+    此處理器將格式化後的記錄編碼成位元組累積在緩衝區，只在緩衝滿、遇到 ERROR
+    以上的記錄、定期寫入或關閉時才以一次 os.write 寫入磁碟。
+    此處理器由背景佇列監聽器的單一執行緒使用，定期寫入則透過處理器鎖同步。
+    檔案超過 max_bytes 時依 RotatingFileHandler 的命名方式輪替（.1、.2 ...）。
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8", max_bytes: int = 0,
+                 backup_count: int = 0, delay: bool = False):
+        """初始化處理器
+
+        Args:
+            path: 日誌檔案路徑
+            encoding: 日誌檔案的編碼
+            max_bytes: 單一檔案大小上限，0 表示不輪替
+            backup_count: 保留的備份檔案數量，0 表示不輪替
+            delay: 是否延遲到第一次寫入時才開啟檔案
+        """
+        super().__init__()
+        self.baseFilename = os.path.abspath(path)
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._fd = None
+        self._size = 0
+        self._closed = False
+        self._buffer = bytearray()
+        if not delay:
+            self._open()
+
+    def _open(self) -> None:
+        self._fd = os.open(self.baseFilename, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        self._size = os.fstat(self._fd).st_size
+
+    def _rollover(self) -> None:
+        """關閉目前的檔案，將既有檔案依序更名為 .1、.2 ... 後重新開啟"""
+        os.close(self._fd)
+        self._fd = None
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.baseFilename}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.baseFilename}.{i + 1}")
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        self._open()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer or self._closed:
+            return
+        # 開啟或寫入檔案失敗時也捨棄緩衝，交由呼叫端回報錯誤，避免記錄無限累積
+        try:
+            if self._fd is None:
+                self._open()
+            if (self.max_bytes > 0 and self.backup_count > 0 and self._size > 0
+                    and self._size + len(self._buffer) > self.max_bytes):
+                self._rollover()
+            
+            view = memoryview(self._buffer)
+            try:
+                while view:
+                    written = os.write(self._fd, view)
+                    view = view[written:]
+            finally:
+                view.release()
+            self._size += len(self._buffer)
+        finally:
+            self._buffer.clear()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer += (self.format(record) + "\n").encode(self.encoding)
+            # 緩衝已滿或為錯誤記錄時立即寫入，方便排查問題
+            if len(self._buffer) >= FILE_BUFFER_SIZE or record.levelno >= logging.ERROR:
+                self._write_buffer()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            try:
+                self._write_buffer()
+            finally:
+                self._closed = True
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+        finally:
+            self.release()
+        super().close()
+
+class _LoggerRouter(logging.Handler):
+    """依記錄器名稱將記錄分派到對應檔案處理器的分派表
+
+    佇列監聽器只呼叫此處理器一次，由記錄器名稱（含其上層名稱）查表找到目標處理器，
+    不需要逐一詢問每個檔案處理器的過濾器。
+    分派表的值為 (處理器, 級別)：同一檔案的處理器由多個記錄器共用，級別依記錄器各自設定。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        routes = self.routes
+        name = record.name
+        route = routes.get(name)
+        while route is None and "." in name:
+            name = name.rpartition(".")[0]
+            route = routes.get(name)
+        if route is None:
+            return False
+        target, level = route
+        if record.levelno < level:
+            return False
+        return target.handle(record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+_router = _LoggerRouter()
+_listener.handlers = (_router,)
+
+@lru_cache(maxsize=None)
+def _get_file_handler(path: str) -> RawAppendHandler:
+    """取得指定路徑的共用檔案處理器，同一路徑只開啟一次檔案
+
+    Args:
+        path: 日誌檔案路徑
+
+    Returns:
+        註冊於背景佇列監聽器的檔案處理器
+    """
+    file_handler = RawAppendHandler(
+        path,
+        encoding="utf-8",
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        delay=True
+    )
+    file_handler.setFormatter(_file_formatter)
+    return file_handler
+
+@lru_cache(maxsize=None)
+def _get_buffered_handler(path: str) -> logging.handlers.MemoryHandler:
+    """取得包裝共用檔案處理器的緩衝處理器，將記錄批次寫入檔案
+
+    同一路徑只建立一個緩衝處理器；各記錄器的檔案級別記錄在分派表中。
+
+    Args:
+        path: 日誌檔案路徑
+
+    Returns:
+        註冊於背景佇列監聽器的緩衝處理器
+    """
+    buffered = logging.handlers.MemoryHandler(
+        capacity=BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=_get_file_handler(path),
+        flushOnClose=True
+    )
+    _file_handlers.append(buffered)
+    return buffered
+
 def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging.INFO, 
                  console_level: int = logging.INFO, file_level: int = logging.DEBUG) -> logging.Logger:
     """設定並返回一個配置好的日誌記錄器
@@ -37,31 +427,78 @@ def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
-    # 清除現有處理器
+    # 清除現有處理器，並避免記錄再傳遞到根記錄器的處理器
     if logger.handlers:
         logger.handlers.clear()
+    logger.propagate = False
+    logger.disabled = False
     
-    # 添加控制台處理器
-    console_handler = logging.StreamHandler(sys.stderr)
-    console_handler.setLevel(console_level)
-    console_formatter = logging.Formatter(CONSOLE_FORMAT, CONSOLE_DATE_FORMAT)
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    # 添加共用的控制台處理器（僅在啟用控制台輸出時）
+    if _CONSOLE_ENABLED:
+        logger.addHandler(_get_console_handler(console_level))
     
-    # 如果指定了日誌檔案，添加檔案處理器
+    # 如果指定了日誌檔案，由背景執行緒的檔案處理器寫入，記錄器只掛上佇列處理器
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setLevel(file_level)
-        file_formatter = logging.Formatter(DEFAULT_FORMAT)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        # 只將屬於此記錄器的記錄分派到此檔案，避免寫入其他記錄器的檔案
+        _router.routes[name] = (_get_buffered_handler(log_file), file_level)
+        logger.addHandler(_queue_handler)
     
     return logger
 
-# 預設日誌記錄器
-weather_api_logger = setup_logger("weather_api", WEATHER_API_LOG, level=logging.DEBUG)
-api_requests_logger = setup_logger("weather_api_requests", API_REQUESTS_LOG, level=logging.DEBUG)
-server_logger = setup_logger("taiwan-weather-mcp", SERVER_LOG, level=logging.INFO)
-warnings_logger = setup_logger("weather_warnings", WARNINGS_LOG, level=logging.DEBUG)
-forecast_logger = setup_logger("weather_forecast", FORECAST_LOG, level=logging.DEBUG)
-observations_logger = setup_logger("weather_observation", OBSERVATION_LOG, level=logging.DEBUG)
+def dlog(logger, fmt: str, *args) -> None:
+    """僅在記錄器啟用 DEBUG 級別時才記錄除錯訊息
+
+    呼叫端應傳入 %-style 格式字串與參數，不要使用 f-string，
+    讓參數只在確定需要輸出時才轉成字串。
+
+    Args:
+        logger: 日誌記錄器
+        fmt: %-style 格式字串
+        *args: 格式字串的參數
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(fmt, *args)
+
+# 所有模組記錄器都是此根記錄器的子記錄器，處理器只掛在根記錄器上
+ROOT_LOGGER_NAME = "weather"
+_root_lock = threading.Lock()
+
+def _get_root_logger() -> logging.Logger:
+    """取得共用的根記錄器，第一次呼叫時掛上控制台處理器與佇列處理器"""
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    if _queue_handler not in root.handlers:
+        with _root_lock:
+            if _queue_handler not in root.handlers:
+                setup_logger(ROOT_LOGGER_NAME, level=logging.DEBUG)
+                root.addHandler(_queue_handler)
+    return root
+
+def setup_child_logger(suffix: str, log_file: str, level: int = logging.INFO) -> logging.Logger:
+    """設定並返回根記錄器下的子記錄器
+
+    子記錄器本身不掛處理器，記錄傳遞到根記錄器後由分派表寫入對應的日誌檔案。
+    低於子記錄器級別的記錄在建立前就會被捨棄。
+
+    Args:
+        suffix: 子記錄器名稱（不含根記錄器名稱）
+        log_file: 日誌檔案路徑
+        level: 子記錄器的日誌級別
+
+    Returns:
+        配置好的子記錄器
+    """
+    _get_root_logger()
+    name = f"{ROOT_LOGGER_NAME}.{suffix}"
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = True
+    _router.routes[name] = (_get_buffered_handler(log_file), logging.DEBUG)
+    return logger
+
+# 預設日誌記錄器：匯入時直接建立實際的 Logger，檔案延到第一次寫入時才開啟
+weather_api_logger = setup_child_logger("api", WEATHER_API_LOG, level=LOG_LEVEL)
+api_requests_logger = setup_child_logger("api_requests", API_REQUESTS_LOG, level=LOG_LEVEL)
+server_logger = setup_child_logger("server", SERVER_LOG, level=LOG_LEVEL)
+warnings_logger = setup_child_logger("warnings", WARNINGS_LOG, level=LOG_LEVEL)
+forecast_logger = setup_child_logger("forecast", FORECAST_LOG, level=LOG_LEVEL)
+observations_logger = setup_child_logger("observation", OBSERVATION_LOG, level=LOG_LEVEL)
@@ -0,0 +1,72 @@
+"""forecast_parse 解析函式的回歸測試
+
+以 tests/fixtures 中的 CWA API 回應為輸入，比對 parse_36h 與 parse_7d 的輸出與預期結果。
+"""
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast_parse import parse_36h, parse_7d
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# (案例名稱, 回應檔案, 指定地點, 指定的天氣元素類型)
+CASES_36H = [
+    ("36h_all", "forecast_36h.json", None),
+    ("36h_taipei", "forecast_36h.json", "臺北市"),
+    ("36h_missing", "forecast_36h.json", "花蓮縣"),
+]
+CASES_7D = [
+    ("7d_all", "forecast_7d.json", None, None),
+    ("7d_taipei", "forecast_7d.json", "臺北市", None),
+    ("7d_description", "forecast_7d.json", "新北市", "天氣預報綜合描述"),
+    ("7d_temperatures", "forecast_7d.json", None, "最高溫度,最低溫度"),
+    ("7d_kaohsiung_weather", "forecast_7d.json", "高雄市", "天氣現象,12小時降雨機率"),
+    ("7d_missing", "forecast_7d.json", "花蓮縣", None),
+    ("7d_lowercase_all", "forecast_7d_lowercase.json", None, None),
+    ("7d_lowercase_taipei", "forecast_7d_lowercase.json", "臺北市", None),
+    ("7d_lowercase_temperatures", "forecast_7d_lowercase.json", "臺北市", "最高溫度,最低溫度,12小時降雨機率"),
+]
+
+def load_fixture(name: str):
+    """讀取測試用的 JSON 檔案，每次都重新讀取以免解析函式修改到其他案例的輸入"""
+    with open(FIXTURES_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+class ForecastParseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = load_fixture("forecast_parse_expected.json")
+
+    def test_parse_36h(self):
+        for name, fixture, location in CASES_36H:
+            with self.subTest(name):
+                records = load_fixture(fixture)["records"]
+                result = parse_36h(records["location"], location, "36h")
+                self.assertEqual(result, self.expected[name])
+
+    def test_parse_7d(self):
+        for name, fixture, location, element_types in CASES_7D:
+            with self.subTest(name):
+                records = load_fixture(fixture)["records"]
+                result = parse_7d(records["Locations"], location, "7d", element_types)
+                self.assertEqual(result, self.expected[name])
+
+    def test_7d_key_casing_gives_same_forecasts(self):
+        """ElementName/Time/ElementValue 與小寫欄位格式的回應應解析出相同的時段資料"""
+        for location in (None, "臺北市"):
+            with self.subTest(location=location):
+                upper = parse_7d(load_fixture("forecast_7d.json")["records"]["Locations"], location, "7d", None)
+                lower = parse_7d(load_fixture("forecast_7d_lowercase.json")["records"]["Locations"], location, "7d", None)
+                upper_locations = upper.get("locations", [upper])
+                lower_locations = lower.get("locations", [lower])
+                self.assertEqual(
+                    [(loc["location"], loc["forecasts"]) for loc in upper_locations],
+                    [(loc["location"], loc["forecasts"]) for loc in lower_locations]
+                )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""logger_config 佇列處理器與 JSON 格式化器的測試
+
+記錄經過共用佇列處理器的 prepare() 後，再交給檔案使用的 OrjsonFormatter，
+確認例外與堆疊資訊仍以獨立欄位輸出，不會併入訊息。
+"""
+import json
+import logging
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from logger_config import OrjsonFormatter, _queue_handler
+
+def make_record(msg: str, args: tuple = (), exc_info=None, stack_info=None) -> logging.LogRecord:
+    """建立與 Logger 產生的相同的記錄"""
+    logger = logging.getLogger("weather.test")
+    return logger.makeRecord(logger.name, logging.ERROR, __file__, 0, msg, args, exc_info, sinfo=stack_info)
+
+class OrjsonQueueTest(unittest.TestCase):
+    def format_queued(self, record: logging.LogRecord) -> dict:
+        return json.loads(OrjsonFormatter().format(_queue_handler.prepare(record)))
+
+    def test_message_args_are_rendered_before_queueing(self):
+        prepared = _queue_handler.prepare(make_record("查詢 %s 失敗: %d", ("臺北市", 500)))
+        self.assertEqual(prepared.msg, "查詢 臺北市 失敗: 500")
+        self.assertIsNone(prepared.args)
+
+    def test_exception_is_written_to_e_field(self):
+        try:
+            raise ValueError("bad payload")
+        except ValueError:
+            record = make_record("處理 %s 時發生錯誤", ("臺北市",), exc_info=sys.exc_info())
+
+        data = self.format_queued(record)
+        self.assertEqual(data["m"], "處理 臺北市 時發生錯誤")
+        self.assertNotIn("Traceback", data["m"])
+        self.assertTrue(data["e"].startswith("Traceback"))
+        self.assertIn("ValueError: bad payload", data["e"])
+
+    def test_stack_info_is_written_to_s_field(self):
+        data = self.format_queued(make_record("目前的呼叫堆疊", stack_info="Stack (most recent call last):\n  ..."))
+        self.assertEqual(data["m"], "目前的呼叫堆疊")
+        self.assertEqual(data["s"], "Stack (most recent call last):\n  ...")
+        self.assertNotIn("e", data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""CWAWeatherAPI 回應整理的回歸測試
+
+以 tests/fixtures 中的 36 小時預報回應取代實際的 API 請求，比對 parsed_forecasts 與預期結果。
+需要安裝 requirements.txt 中的套件（httpx、python-dotenv）。
+"""
+import asyncio
+import copy
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from weather_api import CWAWeatherAPI
+except ImportError:
+    CWAWeatherAPI = None
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+def load_fixture(name: str):
+    with open(FIXTURES_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+@unittest.skipIf(CWAWeatherAPI is None, "需要安裝 httpx 與 python-dotenv")
+class ParsedForecastsTest(unittest.TestCase):
+    def test_parsed_forecasts_36h(self):
+        response = load_fixture("forecast_36h.json")
+        expected = load_fixture("weather_api_parsed_36h_expected.json")
+        
+        async def fake_request(*args, **kwargs):
+            return copy.deepcopy(response)
+        
+        for location in (None, "臺北市", "台北", "花蓮縣"):
+            with self.subTest(location=location):
+                api = CWAWeatherAPI(api_key="test-key")
+                api._make_request = fake_request
+                result = asyncio.run(api.get_weather_forecast(location=location, forecast_type="36h"))
+                self.assertEqual(result.get("parsed_forecasts"), expected[str(location)])
+
+if __name__ == "__main__":
+    unittest.main()
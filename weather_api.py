@@ -1,23 +1,78 @@
 import httpx
 import os
 import json
+import time
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, FrozenSet
 from datetime import datetime
-from logger_config import weather_api_logger as logger, api_requests_logger as api_logger
+from logger_config import weather_api_logger as logger, api_requests_logger as api_logger, dlog
 
 load_dotenv()
 
+# 有安裝 orjson 時直接以其解析回應的原始位元組，否則使用標準函式庫
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# 天氣預報約數十分鐘才更新一次，預報的 API 回應內容快取 5 分鐘
+FORECAST_CACHE_TTL = 300.0
+
+# 共用 HTTP 連線的設定：保留閒置連線以省去每次請求的 TCP/TLS 交握，
+# 閒置 30 秒即關閉，避免重用已被 CWA 伺服器關閉的連線
+HTTP_TIMEOUT = 30.0
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30.0)
+
+# 地名中沒有這些字元時，比對地點時另外嘗試補上「市」或「縣」
+_CITY_COUNTY_SUFFIXES = frozenset('市縣')
+
+def _parsed_wx(parameter: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    entry["weather"] = parameter.get("parameterName")
+    entry["weather_code"] = parameter.get("parameterValue")
+
+def _make_parsed_number(entry_key: str, clamp: bool = False):
+    """建立將 parameterName 轉為數值後存入預報資料的解析函式
+
+    Args:
+        entry_key: 要更新的預報資料欄位名稱
+        clamp: 是否將數值限制在 0 到 100 之間（降雨機率）
+
+    Returns:
+        parameter 欄位的解析函式
+    """
+    def handler(parameter: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        try:
+            value = float(parameter.get("parameterName", "0"))
+        except (ValueError, TypeError):
+            entry[entry_key] = None
+            return
+        entry[entry_key] = max(0, min(100, value)) if clamp else value
+    return handler
+
+def _parsed_ci(parameter: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    entry["comfort_index"] = parameter.get("parameterName")
+
+# 36 小時預報各天氣元素對應的解析函式，每個時段只需一次查表
+_PARSED_36H = {
+    "Wx": _parsed_wx,
+    "PoP": _make_parsed_number("precipitation_probability", clamp=True),
+    "MinT": _make_parsed_number("min_temperature"),
+    "MaxT": _make_parsed_number("max_temperature"),
+    "CI": _parsed_ci,
+}
+
 class CWAWeatherAPI:
     """Client for the Central Weather Administration (CWA) Open Data API."""
     
     BASE_URL = "https://opendata.cwa.gov.tw/api/v1/rest/datastore"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None):
         """Initialize the CWA API client.
         
         Args:
             api_key: API key for the CWA API. If not provided, will be loaded from environment.
+            http_client: Optional shared HTTP client. If not provided, one is created on the first request.
         """
         self.api_key = api_key or os.getenv("CWA_API_KEY")
         if not self.api_key:
@@ -26,13 +81,33 @@ class CWAWeatherAPI:
         # 記錄 API 金鑰的前幾個字符（出於安全考慮不記錄完整金鑰）
         masked_key = self.api_key[:8] + "..." if self.api_key else "None"
         logger.info(f"初始化 CWA API 客戶端，API 金鑰: {masked_key}")
+        
+        # API 回應內容的快取：{(端點, 參數): (到期時間, 回應內容)}
+        self._response_cache: Dict[tuple, tuple] = {}
+        
+        # 所有請求共用同一個 HTTP 客戶端，重用連線池中的連線
+        self._client = http_client
+        self._owns_client = http_client is None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+        return self._client
     
-    async def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def aclose(self) -> None:
+        """Close the HTTP client if it was created by this instance."""
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None, cache_ttl: float = 0) -> Dict[str, Any]:
         """Make a request to the CWA API.
         
         Args:
             endpoint: API endpoint to call
             params: Optional query parameters
+            cache_ttl: Seconds to reuse a successful response for identical requests (0 disables caching)
             
         Returns:
             API response JSON as a dictionary
@@ -53,93 +128,116 @@ class CWAWeatherAPI:
                 masked_params["Authorization"] = auth_value[:8] + "..."
         
         api_logger.info(f"[請求 {request_id}] 端點: {endpoint}, URL: {url}")
-        api_logger.debug(f"[請求 {request_id}] 參數: {masked_params}")
+        dlog(api_logger, "[請求 %s] 參數: %s", request_id, masked_params)
+        
+        # 有效期限內的相同請求直接使用快取的回應內容，重新解析以免呼叫端修改到快取的資料
+        cache_key = (endpoint, tuple(sorted(params.items())) if params else ())
+        cached = self._response_cache.get(cache_key) if cache_ttl > 0 else None
+        if cached and cached[0] > time.monotonic():
+            api_logger.info(f"[請求 {request_id}] 使用快取的回應")
+            return self._decode_response(cached[1], request_id)
             
         logger.info(f"發送請求到 {url}")
-        logger.debug(f"請求參數: {masked_params}")
+        dlog(logger, "請求參數: %s", masked_params)
+            
+        client = self._get_client()
+        try:
+            response = await client.get(url, params=request_params)
+            logger.info(f"API 回應狀態碼: {response.status_code}")
+            api_logger.info(f"[回應 {request_id}] 狀態碼: {response.status_code}")
+            
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                error_msg = f"HTTP 請求失敗: {e}"
+                logger.error(error_msg)
+                api_logger.error(f"[回應 {request_id}] {error_msg}")
+                return {"error": f"HTTP 錯誤: {e}"}
             
-        async with httpx.AsyncClient(timeout=30.0) as client:
             try:
-                response = await client.get(url, params=request_params)
-                logger.info(f"API 回應狀態碼: {response.status_code}")
-                api_logger.info(f"[回應 {request_id}] 狀態碼: {response.status_code}")
+                # 讀取完整的回應內容，保留原始位元組交給 JSON 解析，不另外解碼成字串
+                content = response.content
+                data = self._decode_response(content, request_id)
                 
-                try:
-                    response.raise_for_status()
-                except httpx.HTTPStatusError as e:
-                    error_msg = f"HTTP 請求失敗: {e}"
-                    logger.error(error_msg)
-                    api_logger.error(f"[回應 {request_id}] {error_msg}")
-                    return {"error": f"HTTP 錯誤: {e}"}
+                # 只快取成功的回應，重複的請求在有效期限內直接使用
+                if cache_ttl > 0 and "error" not in data:
+                    self._response_cache[cache_key] = (time.monotonic() + cache_ttl, content)
+                return data
                 
-                try:
-                    # 讀取完整的回應內容
-                    content = response.text
-                    
-                    # 記錄回應內容到專門的日誌檔案
-                    content_preview = content[:500] + "..." if len(content) > 500 else content
-                    api_logger.debug(f"[回應 {request_id}] 內容: {content_preview}")
-                    
-                    # 檢查回應內容是否為空
-                    if not content.strip():
-                        error_msg = "API 回應內容為空"
-                        logger.error(error_msg)
-                        api_logger.error(f"[回應 {request_id}] {error_msg}")
-                        return {"error": "空的 API 回應"}
-                    
-                    # 嘗試解析 JSON
-                    try:
-                        data = json.loads(content)
-                    except json.JSONDecodeError as e:
-                        error_msg = f"JSON 解析錯誤: {str(e)}\n回應內容: {content[:200]}..."
-                        logger.error(error_msg)
-                        api_logger.error(f"[回應 {request_id}] {error_msg}")
-                        return {"error": f"JSON 解析錯誤: {str(e)}"}
-                    
-                    # 驗證資料結構
-                    if not isinstance(data, dict):
-                        error_msg = f"無效的回應格式: 預期 dict，得到 {type(data)}"
-                        logger.error(error_msg)
-                        api_logger.error(f"[回應 {request_id}] {error_msg}")
-                        return {"error": error_msg}
-                    
-                    # 檢查 success 欄位
-                    if "success" in data and not data["success"]:
-                        error_msg = data.get("message", "未知 API 錯誤")
-                        logger.error(f"API 返回失敗: {error_msg}")
-                        api_logger.error(f"[回應 {request_id}] API 返回失敗: {error_msg}")
-                        return {"error": f"API 錯誤: {error_msg}"}
-                    
-                    # 檢查並處理 records
-                    if "records" in data:
-                        if not data["records"]:
-                            logger.warning("回應中 records 為空")
-                            api_logger.warning(f"[回應 {request_id}] 回應中 records 為空")
-                            return {"error": "無資料"}
-                            
-                        # 處理可能的換行符號
-                        if isinstance(data["records"], dict):
-                            for key, value in data["records"].items():
-                                if isinstance(value, str):
-                                    data["records"][key] = value.replace("\\n", "\n").replace("\r\n", "\n")
-                    else:
-                        logger.error("回應中缺少 records 欄位")
-                        return {"error": "無效的回應: 缺少 records 欄位"}
-                    
-                    return data
-                    
-                except Exception as e:
-                    logger.error(f"處理回應時發生錯誤: {str(e)}")
-                    return {"error": f"處理回應錯誤: {str(e)}"}
-                    
-            except httpx.TimeoutException:
-                logger.error("請求超時")
-                return {"error": "請求超時"}
             except Exception as e:
-                logger.error(f"請求時發生錯誤: {str(e)}")
-                return {"error": f"請求錯誤: {str(e)}"}
+                logger.error(f"處理回應時發生錯誤: {str(e)}")
+                return {"error": f"處理回應錯誤: {str(e)}"}
+                
+        except httpx.TimeoutException:
+            logger.error("請求超時")
+            return {"error": "請求超時"}
+        except Exception as e:
+            logger.error(f"請求時發生錯誤: {str(e)}")
+            return {"error": f"請求錯誤: {str(e)}"}
+    
+    def _decode_response(self, content: bytes, request_id: str) -> Dict[str, Any]:
+        """Decode and validate the body of a CWA API response.
+        
+        Args:
+            content: Raw response body
+            request_id: Request ID used in log messages
+            
+        Returns:
+            API response JSON as a dictionary, or a dict with an "error" key
+        """
+        # 記錄回應內容到專門的日誌檔案
+        content_preview = content[:500].decode("utf-8", errors="replace") + ("..." if len(content) > 500 else "")
+        dlog(api_logger, "[回應 %s] 內容: %s", request_id, content_preview)
+        
+        # 檢查回應內容是否為空
+        if not content.strip():
+            error_msg = "API 回應內容為空"
+            logger.error(error_msg)
+            api_logger.error(f"[回應 {request_id}] {error_msg}")
+            return {"error": "空的 API 回應"}
+        
+        # 嘗試解析 JSON
+        try:
+            data = json_loads(content)
+        except json.JSONDecodeError as e:
+            error_msg = f"JSON 解析錯誤: {str(e)}\n回應內容: {content[:200].decode('utf-8', errors='replace')}..."
+            logger.error(error_msg)
+            api_logger.error(f"[回應 {request_id}] {error_msg}")
+            return {"error": f"JSON 解析錯誤: {str(e)}"}
+        
+        # 驗證資料結構
+        if not isinstance(data, dict):
+            error_msg = f"無效的回應格式: 預期 dict，得到 {type(data)}"
+            logger.error(error_msg)
+            api_logger.error(f"[回應 {request_id}] {error_msg}")
+            return {"error": error_msg}
+        
+        # 檢查 success 欄位
+        if "success" in data and not data["success"]:
+            error_msg = data.get("message", "未知 API 錯誤")
+            logger.error(f"API 返回失敗: {error_msg}")
+            api_logger.error(f"[回應 {request_id}] API 返回失敗: {error_msg}")
+            return {"error": f"API 錯誤: {error_msg}"}
+        
+        # 檢查並處理 records
+        if "records" in data:
+            if not data["records"]:
+                logger.warning("回應中 records 為空")
+                api_logger.warning(f"[回應 {request_id}] 回應中 records 為空")
+                return {"error": "無資料"}
+                
+            # 處理可能的換行符號
+            if isinstance(data["records"], dict):
+                for key, value in data["records"].items():
+                    if isinstance(value, str):
+                        data["records"][key] = value.replace("\\n", "\n").replace("\r\n", "\n")
+        else:
+            logger.error("回應中缺少 records 欄位")
+            return {"error": "無效的回應: 缺少 records 欄位"}
+        
+        return data
     
-    async def get_weather_forecast(self, location: str = None, element: str = None, forecast_type: str = "36h", filter_response: bool = True, element_types: List[str] = None) -> Dict[str, Any]:
+    async def get_weather_forecast(self, location: str = None, element: str = None, forecast_type: str = "36h", filter_response: bool = True, element_types: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
         """Get weather forecast data.
         
         Args:
@@ -147,7 +245,7 @@ class CWAWeatherAPI:
             element: Optional weather element to filter results
             forecast_type: Type of forecast, either "36h" or "7d"
             filter_response: Whether to filter the API response to only include relevant data
-            element_types: List of weather element types to include in the response (七日預報專用)
+            element_types: Set of weather element types to include in the response (七日預報專用)
                           如果未指定，七日預報預設只包含「天氣預報綜合描述」
                           可用的元素類型：平均溫度、最高溫度、最低溫度、平均露點溫度、平均相對濕度、
                                       最高體感溫度、最低體感溫度、最大舒適度指數、最小舒適度指數、
@@ -210,12 +308,12 @@ class CWAWeatherAPI:
             api_logger.info(f"七日預報請求，地點: {location if location else '全臺灣'}，參數: {params}")
             
             # 記錄完整的參數資訊以便進行除錯
-            api_logger.debug(f"七日預報完整參數: {params}")
+            dlog(api_logger, "七日預報完整參數: %s", params)
             
         logger.info(f"使用端點: {endpoint}，參數: {params}")
         
         try:
-            data = await self._make_request(endpoint, params)
+            data = await self._make_request(endpoint, params, cache_ttl=FORECAST_CACHE_TTL)
             
             # 檢查是否有錯誤訊息
             if "error" in data:
@@ -279,7 +377,7 @@ class CWAWeatherAPI:
                                 location_variants.append(location.replace('台', '臺'))
                             
                             # 如果沒有包含「市」或「縣」，嘗試添加
-                            if not any(x in location for x in ['市', '縣']):
+                            if _CITY_COUNTY_SUFFIXES.isdisjoint(location):
                                 location_variants.extend([f"{loc}市" for loc in location_variants])
                                 location_variants.extend([f"{loc}縣" for loc in location_variants])
                             
@@ -292,13 +390,13 @@ class CWAWeatherAPI:
                                 # 檢查是否有任何變體匹配
                                 if any(variant in loc_name or loc_name in variant for variant in location_variants):
                                     matched_locations.append(loc)
-                                    api_logger.info(f"找到匹配地點: {loc_name}")
+                                    dlog(api_logger, "找到匹配地點: %s", loc_name)
                                     # 檢查天氣元素是否為空，支援不同的欄位名稱格式
                                     weather_elements = []
                                     for field_name in ["weatherElement", "WeatherElement"]:
                                         if field_name in loc and loc[field_name]:
                                             weather_elements = loc[field_name]
-                                            api_logger.info(f"地點 {loc_name} 使用 {field_name} 欄位")
+                                            dlog(api_logger, "地點 %s 使用 %s 欄位", loc_name, field_name)
                                             break
                                     
                                     if not weather_elements:
@@ -318,7 +416,7 @@ class CWAWeatherAPI:
                                     if forecast_type != "36h" and matched_locations:
                                         # 預設只保留「天氣預報綜合描述」
                                         if element_types is None:
-                                            element_types = ["天氣預報綜合描述"]
+                                            element_types = frozenset(("天氣預報綜合描述",))
                                             
                                         # 記錄要保留的元素類型
                                         api_logger.info(f"七日預報只保留以下元素類型: {element_types}")
@@ -420,7 +518,7 @@ class CWAWeatherAPI:
                         location_variants.append(location.replace('台', '臺'))
                     
                     # 如果沒有包含「市」或「縣」，嘗試添加
-                    if not any(x in location for x in ['市', '縣']):
+                    if _CITY_COUNTY_SUFFIXES.isdisjoint(location):
                         location_variants.extend([f"{loc}市" for loc in location_variants])
                         location_variants.extend([f"{loc}縣" for loc in location_variants])
                     
@@ -445,7 +543,7 @@ class CWAWeatherAPI:
                 # 解析匹配地點的天氣資料
                 for loc in matched_locations:
                     loc_name = loc.get("locationName", "未知")
-                    api_logger.info(f"解析 {loc_name} 的天氣預報資料")
+                    dlog(api_logger, "解析 %s 的天氣預報資料", loc_name)
                     
                     # 建立結構化的預報資料
                     parsed_forecast = {
@@ -460,7 +558,8 @@ class CWAWeatherAPI:
                         if "time" in first_element:
                             time_periods = first_element["time"]
                         
-                        # 為每個時間區段建立預報資料結構
+                        # 為每個時間區段建立預報資料結構，並以 (開始, 結束) 時間索引
+                        entries = {}
                         for period in time_periods:
                             start_time = period.get("startTime")
                             end_time = period.get("endTime")
@@ -475,40 +574,19 @@ class CWAWeatherAPI:
                                 "precipitation_probability": None,
                                 "comfort_index": None
                             }
-                            
-                            # 解析每個天氣元素的資料
+                            entries[(start_time, end_time)] = forecast_entry
+                            parsed_forecast["forecasts"].append(forecast_entry)
+                        
+                        # 解析每個天氣元素的資料，依元素名稱查表取得解析函式
+                        if entries:
                             for element in loc["weatherElement"]:
-                                elem_name = element.get("elementName")
-                                # 找到對應時間區段的資料
+                                handler = _PARSED_36H.get(element.get("elementName"))
+                                if handler is None:
+                                    continue
                                 for time_data in element["time"]:
-                                    if time_data["startTime"] == start_time and time_data["endTime"] == end_time:
-                                        param = time_data.get("parameter", {})
-                                        
-                                        if elem_name == "Wx":
-                                            forecast_entry["weather"] = param.get("parameterName")
-                                            forecast_entry["weather_code"] = param.get("parameterValue")
-                                        elif elem_name == "PoP":
-                                            try:
-                                                prob = float(param.get("parameterName", "0"))
-                                                forecast_entry["precipitation_probability"] = max(0, min(100, prob))
-                                            except (ValueError, TypeError):
-                                                forecast_entry["precipitation_probability"] = None
-                                        elif elem_name == "MinT":
-                                            try:
-                                                temp = float(param.get("parameterName", "0"))
-                                                forecast_entry["min_temperature"] = temp
-                                            except (ValueError, TypeError):
-                                                forecast_entry["min_temperature"] = None
-                                        elif elem_name == "MaxT":
-                                            try:
-                                                temp = float(param.get("parameterName", "0"))
-                                                forecast_entry["max_temperature"] = temp
-                                            except (ValueError, TypeError):
-                                                forecast_entry["max_temperature"] = None
-                                        elif elem_name == "CI":
-                                            forecast_entry["comfort_index"] = param.get("parameterName")
-                            
-                            parsed_forecast["forecasts"].append(forecast_entry)
+                                    forecast_entry = entries.get((time_data["startTime"], time_data["endTime"]))
+                                    if forecast_entry is not None:
+                                        handler(time_data.get("parameter", {}), forecast_entry)
                     
                     # 將解析後的資料加入回傳結果
                     if "parsed_forecasts" not in data:
@@ -521,7 +599,7 @@ class CWAWeatherAPI:
                 logger.error(error_msg)
                 api_logger.error(error_msg)
                 # 記錄更多資訊以協助除錯
-                api_logger.debug(f"完整的七日預報回應: {data}")
+                dlog(api_logger, "完整的七日預報回應: %s", data)
                 return {"error": error_msg}
             elif forecast_type != "36h" and isinstance(data["records"]["Locations"], list) and not data["records"]["Locations"]:
                 error_msg = f"七日預報 Locations 欄位為空列表: {data['records']}"
@@ -529,190 +607,6 @@ class CWAWeatherAPI:
                 api_logger.error(error_msg)
                 return {"error": error_msg}
             
-            # 如果有匹配的七日預報資料，記錄天氣元素的詳細資訊
-            if forecast_type != "36h" and location and "Locations" in data["records"] and isinstance(data["records"]["Locations"], list):
-                try:
-                    # 建立可能的地點名稱變體
-                    location_variants = [location]
-                    if '臺' in location:
-                        location_variants.append(location.replace('臺', '台'))
-                    elif '台' in location:
-                        location_variants.append(location.replace('台', '臺'))
-                    
-                    # 如果沒有包含「市」或「縣」，嘗試添加
-                    if not any(x in location for x in ['市', '縣']):
-                        location_variants.extend([f"{loc}市" for loc in location_variants])
-                        location_variants.extend([f"{loc}縣" for loc in location_variants])
-                    
-                    # 記錄嘗試匹配的變體
-                    api_logger.info(f"嘗試匹配的地點變體: {location_variants}")
-                    
-                    # 尋找匹配的地點
-                    matched_locations = []
-                    available_locations = []
-                    
-                    for loc_group in data["records"]["Locations"]:
-                        if "Location" in loc_group:
-                            for loc in loc_group["Location"]:
-                                loc_name = loc.get("LocationName", "")
-                                available_locations.append(loc_name)
-                                
-                                # 檢查是否有任何變體匹配
-                                for variant in location_variants:
-                                    # 完全匹配
-                                    if variant == loc_name:
-                                        matched_locations.append(loc)
-                                        api_logger.info(f"找到完全匹配地點 '{variant}' 的七日預報資料: [{loc_name}]")
-                                        break
-                    
-                    # 如果沒有找到完全匹配，嘗試部分匹配
-                    if not matched_locations:
-                        for loc_group in data["records"]["Locations"]:
-                            if "Location" in loc_group:
-                                for loc in loc_group["Location"]:
-                                    loc_name = loc.get("LocationName", "")
-                                    
-                                    # 檢查是否有任何變體匹配
-                                    for variant in location_variants:
-                                        if variant in loc_name or loc_name in variant:
-                                            matched_locations.append(loc)
-                                            api_logger.info(f"找到部分匹配地點 '{variant}' 的七日預報資料: [{loc_name}]")
-                                            break
-                    
-                    if not matched_locations:
-                        error_msg = f"找不到 {location} 的天氣預報資料"
-                        logger.warning(error_msg)
-                        api_logger.warning(error_msg)
-                        
-                        # 記錄可用的地點名稱，以便除錯
-                        api_logger.info(f"可用的地點名稱（前10個）: {available_locations[:10]}")
-                        
-                        # 如果是「台北市」，嘗試直接使用「臺北市」
-                        if location == "台北市":
-                            api_logger.info("嘗試使用「臺北市」代替「台北市」")
-                            for loc_group in data["records"]["Locations"]:
-                                if "Location" in loc_group:
-                                    for loc in loc_group["Location"]:
-                                        if loc.get("LocationName", "") == "臺北市":
-                                            matched_locations.append(loc)
-                                            api_logger.info(f"找到臺北市的七日預報資料")
-                                            break
-                        
-                        if not matched_locations:
-                            return {"error": error_msg}
-                    
-                    api_logger.info(f"找到 {len(matched_locations)} 個匹配的地點預報資料")
-                    
-                    # 記錄天氣元素資訊
-                    for loc in matched_locations:
-                        loc_name = loc.get("LocationName", "未知")
-                        api_logger.info(f"記錄 {loc_name} 的天氣預報資料")
-                        
-                        if "WeatherElement" not in loc:
-                            continue
-                            
-                        weather_elements = loc["WeatherElement"]
-                        api_logger.info(f"找到 {len(weather_elements)} 個天氣元素")
-                        
-                        # 建立結構化的預報資料
-                        parsed_forecast = {
-                            "location": loc_name,
-                            "forecasts": []
-                        }
-
-                        # 記錄溫度和天氣現象
-                        for elem in weather_elements:
-                            elem_name = elem.get("ElementName", "未知")
-                            
-                            # 只記錄重要的天氣元素
-                            if elem_name in ["最高溫度", "最低溫度", "天氣現象", "12小時降雨機率"]:
-                                if "Time" in elem and elem["Time"]:
-                                    for time_data in elem["Time"]:
-                                        start_time = time_data.get("StartTime", "未知")
-                                        end_time = time_data.get("EndTime", "未知")
-                                        element_value = time_data.get("ElementValue", [])
-                                        
-                                        # 找到或建立對應時間段的預報資料
-                                        forecast_entry = None
-                                        for entry in parsed_forecast["forecasts"]:
-                                            if entry["start_time"] == start_time and entry["end_time"] == end_time:
-                                                forecast_entry = entry
-                                                break
-                                        
-                                        if forecast_entry is None:
-                                            forecast_entry = {
-                                                "start_time": start_time,
-                                                "end_time": end_time,
-                                                "max_temperature": None,
-                                                "min_temperature": None,
-                                                "weather": None,
-                                                "weather_code": None,
-                                                "precipitation_probability": None
-                                            }
-                                            parsed_forecast["forecasts"].append(forecast_entry)
-                                        
-                                        if element_value and isinstance(element_value, list) and len(element_value) > 0:
-                                            # 根據元素類型更新預報資料
-                                            if elem_name == "最高溫度":
-                                                value = element_value[0].get("MaxTemperature", "未知")
-                                                try:
-                                                    if value != "未知" and value != "-":
-                                                        forecast_entry["max_temperature"] = float(value)
-                                                        api_logger.info(f"  {start_time} 至 {end_time}: 最高溫度 {value}°C")
-                                                    else:
-                                                        forecast_entry["max_temperature"] = None
-                                                except (ValueError, TypeError):
-                                                    forecast_entry["max_temperature"] = None
-                                                    api_logger.warning(f"  無法解析最高溫度值: {value}")
-                                            
-                                            elif elem_name == "最低溫度":
-                                                value = element_value[0].get("MinTemperature", "未知")
-                                                try:
-                                                    if value != "未知" and value != "-":
-                                                        forecast_entry["min_temperature"] = float(value)
-                                                        api_logger.info(f"  {start_time} 至 {end_time}: 最低溫度 {value}°C")
-                                                    else:
-                                                        forecast_entry["min_temperature"] = None
-                                                except (ValueError, TypeError):
-                                                    forecast_entry["min_temperature"] = None
-                                                    api_logger.warning(f"  無法解析最低溫度值: {value}")
-                                            
-                                            elif elem_name == "天氣現象":
-                                                weather = element_value[0].get("Weather", "未知")
-                                                weather_code = element_value[0].get("WeatherCode", "未知")
-                                                forecast_entry["weather"] = weather if weather != "未知" else None
-                                                forecast_entry["weather_code"] = weather_code if weather_code != "未知" else None
-                                                if forecast_entry["weather"]:
-                                                    api_logger.info(f"  {start_time} 至 {end_time}: 天氣現象 {weather}")
-                                                else:
-                                                    api_logger.info(f"  {start_time} 至 {end_time}: 天氣現象 未知")
-                                            
-                                            elif elem_name == "12小時降雨機率":
-                                                value = element_value[0].get("ProbabilityOfPrecipitation", "未知")
-                                                try:
-                                                    if value != "未知" and value != "-":
-                                                        prob = float(value)
-                                                        # Ensure probability is between 0 and 100
-                                                        forecast_entry["precipitation_probability"] = max(0, min(100, prob))
-                                                        api_logger.info(f"  {start_time} 至 {end_time}: 降雨機率 {value}%")
-                                                    else:
-                                                        forecast_entry["precipitation_probability"] = None
-                                                        api_logger.info(f"  {start_time} 至 {end_time}: 降雨機率 未知")
-                                                except (ValueError, TypeError):
-                                                    forecast_entry["precipitation_probability"] = None
-                                                    api_logger.warning(f"  無法解析降雨機率值: {value}")
-
-                        # 將解析後的資料加入到回傳結果中
-                        if "parsed_forecasts" not in data:
-                            data["parsed_forecasts"] = []
-                        data["parsed_forecasts"].append(parsed_forecast)
-                        
-                        api_logger.info(f"  ... (共 {len(parsed_forecast['forecasts'])} 筆預報資料)")
-                        
-                except Exception as e:
-                    api_logger.error(f"記錄七日預報天氣元素時發生錯誤: {str(e)}")
-                    return {"error": f"處理七日預報資料時發生錯誤: {str(e)}"}
-            
             return data
             
         except Exception as e:
@@ -787,7 +681,7 @@ class CWAWeatherAPI:
                                     significance = hazard_info.get("significance", "未知")
                                     start_time = hazard_info.get("startTime", "未知")
                                     end_time = hazard_info.get("endTime", "未知")
-                                    logger.info(f"警特報 {i+1}-{j+1}: {phenomena} ({significance}) - 地區: {loc_name}, 時間: {start_time} 至 {end_time}")
+                                    dlog(logger, "警特報 %d-%d: %s (%s) - 地區: %s, 時間: %s 至 %s", i + 1, j + 1, phenomena, significance, loc_name, start_time, end_time)
                 
                 logger.info(f"找到 {warnings_count} 筆警特報資料")
                 
@@ -979,7 +873,7 @@ class CWAWeatherAPI:
                         location_variants.append(location.replace('台', '臺'))
                     
                     # 如果沒有包含「市」或「縣」，嘗試添加
-                    if not any(x in location for x in ['市', '縣']):
+                    if _CITY_COUNTY_SUFFIXES.isdisjoint(location):
                         location_variants.extend([f"{loc}市" for loc in location_variants])
                         location_variants.extend([f"{loc}縣" for loc in location_variants])
                     
@@ -1078,29 +972,29 @@ class CWAWeatherAPI:
                             # 優先檢查縣市名稱是否匹配
                             if variant_lower == county_lower or county_lower in variant_lower or variant_lower in county_lower:
                                 match_found = True
-                                logger.info(f"找到縣市匹配的觀測站: {full_location_name} (搜尋: {variant}, 縣市: {county_name})")
+                                dlog(logger, "找到縣市匹配的觀測站: %s (搜尋: %s, 縣市: %s)", full_location_name, variant, county_name)
                                 break
                             
                             # 其次檢查區域名稱是否匹配
                             if variant_lower == town_lower or town_lower in variant_lower or variant_lower in town_lower:
                                 match_found = True
-                                logger.info(f"找到區域匹配的觀測站: {full_location_name} (搜尋: {variant}, 區域: {town_name})")
+                                dlog(logger, "找到區域匹配的觀測站: %s (搜尋: %s, 區域: %s)", full_location_name, variant, town_name)
                                 break
                             
                             # 最後檢查觀測站名稱是否匹配
                             if variant_lower == station_lower or station_lower in variant_lower or variant_lower in station_lower:
                                 match_found = True
-                                logger.info(f"找到觀測站名稱匹配的觀測站: {full_location_name} (搜尋: {variant}, 觀測站: {station_name})")
+                                dlog(logger, "找到觀測站名稱匹配的觀測站: %s (搜尋: %s, 觀測站: %s)", full_location_name, variant, station_name)
                                 break
                             
                             # 檢查完整地點名稱是否匹配
                             if variant_lower in full_location_lower:
                                 match_found = True
-                                logger.info(f"找到完整地點匹配的觀測站: {full_location_name} (搜尋: {variant})")
+                                dlog(logger, "找到完整地點匹配的觀測站: %s (搜尋: %s)", full_location_name, variant)
                                 break
                         
                         if not match_found:
-                            logger.debug(f"跳過不匹配的觀測站: {full_location_name} (搜尋: {location})")
+                            dlog(logger, "跳過不匹配的觀測站: %s (搜尋: %s)", full_location_name, location)
                             continue
                     
                     # 建立位置資料結構